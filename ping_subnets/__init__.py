@@ -0,0 +1,3 @@
+"""
+Library that finds IP addresses pingable on one subnet but not the other.
+"""
@@ -0,0 +1,354 @@
+"""
+Minimal ICMPv4 echo implementation used to probe hosts without
+spawning a ``ping`` process per address.
+
+The layout mirrors icmplib: an ``ICMPv4Socket`` sends ``ICMPRequest``
+packets and hands back parsed ``ICMPReply`` objects. Unprivileged
+``SOCK_DGRAM`` sockets are preferred; ``SOCK_RAW`` is used when the
+kernel does not allow them (see ``net.ipv4.ping_group_range``).
+"""
+import array
+import ctypes
+import ctypes.util
+import os
+import select
+import socket
+import struct
+import sys
+import time
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# type, code, checksum, identifier, sequence number
+_ICMP_HDR = struct.Struct("!BBHHH")
+_CHECKSUM = struct.Struct("!H")
+
+# Messages handed to a single sendmmsg(2) call (the kernel caps it at 1024)
+SENDMMSG_BATCH = 512
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_ushort),
+                ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_ubyte * 4),
+                ("sin_zero", ctypes.c_ubyte * 8)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr),
+                ("msg_len", ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    """Returns libc's sendmmsg, or None where it is not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                         ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+def checksum(data: bytes) -> int:
+    """
+    Computes the internet checksum (RFC 1071) of the given data.
+
+    Args:
+        data (bytes): The ICMP header and payload.
+
+    Returns:
+        int: The 16-bit one's complement checksum.
+    """
+    if len(data) % 2:
+        data = bytes(data) + b"\x00"
+    # One's complement sums are byte order independent, so add the
+    # words in native order and swap the folded result if needed
+    total = sum(array.array("H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    total = ~total & 0xFFFF
+    if sys.byteorder == "little":
+        total = (total >> 8) | (total << 8 & 0xFF00)
+    return total
+
+
+class ICMPRequest:
+    """
+    An ICMP Echo Request destined to a single host.
+
+    Args:
+        destination (str): The IP address to probe.
+        ident (int): The ICMP identifier field.
+        sequence (int): The ICMP sequence number field.
+        payload (bytes, optional): Data carried after the header.
+    """
+
+    def __init__(self, destination: str, ident: int, sequence: int,
+                 payload: bytes = b""):
+        self.destination = destination
+        self.ident = ident & 0xFFFF
+        self.sequence = sequence & 0xFFFF
+        self.payload = payload
+        self._packet = None
+
+    def packet(self) -> bytes:
+        """
+        Builds the on-the-wire ICMP Echo Request.
+
+        The packet is built once and reused when the request is
+        sent again.
+
+        Returns:
+            bytes: The 8-byte header followed by the payload.
+        """
+        if self._packet is None:
+            packet = bytearray(_ICMP_HDR.size + len(self.payload))
+            _ICMP_HDR.pack_into(packet, 0, ICMP_ECHO_REQUEST, 0, 0,
+                                self.ident, self.sequence)
+            packet[_ICMP_HDR.size:] = self.payload
+            _CHECKSUM.pack_into(packet, 2, checksum(packet))
+            self._packet = bytes(packet)
+        return self._packet
+
+
+class ICMPReply:
+    """
+    A parsed ICMP message received from a host.
+
+    Args:
+        source (str): The IP address the message came from.
+        ident (int): The ICMP identifier field.
+        sequence (int): The ICMP sequence number field.
+        icmp_type (int): The ICMP type (0 for Echo Reply).
+        code (int): The ICMP code.
+    """
+
+    def __init__(self, source: str, ident: int, sequence: int,
+                 icmp_type: int, code: int):
+        self.source = source
+        self.ident = ident
+        self.sequence = sequence
+        self.type = icmp_type
+        self.code = code
+
+    @classmethod
+    def parse(cls, packet: bytes, source: str, privileged: bool):
+        """
+        Parses a datagram read from an ICMP socket.
+
+        Raw sockets deliver the IPv4 header in front of the ICMP
+        message, datagram sockets do not.
+
+        Args:
+            packet (bytes): The received datagram.
+            source (str): The sender address reported by the socket.
+            privileged (bool): Whether the socket is a raw socket.
+
+        Returns:
+            ICMPReply | None: The parsed reply, or None if the
+            datagram is too short to hold an ICMP header.
+        """
+        if privileged:
+            packet = packet[(packet[0] & 0x0F) * 4:]
+        if len(packet) < 8:
+            return None
+        icmp_type, code, _, ident, sequence = _ICMP_HDR.unpack_from(packet)
+        return cls(source, ident, sequence, icmp_type, code)
+
+
+class ICMPv4Socket:
+    """
+    An ICMPv4 socket able to send Echo Requests and receive replies.
+
+    Replies are matched by the caller on ``(source, sequence)``, which
+    lets a single socket serve many concurrent probes.
+
+    Args:
+        privileged (bool, optional): Force a raw (True) or datagram
+        (False) socket. By default a datagram socket is tried first
+        and a raw socket is used if that is not permitted.
+        blocking (bool, optional): Set to False to drive the socket
+        from an event loop with ``read_replies``.
+        receive_buffer (int, optional): Requested SO_RCVBUF size in
+        bytes, so a burst of replies is queued rather than dropped.
+
+    Raises:
+        PermissionError: If neither socket type may be opened.
+    """
+
+    def __init__(self, privileged: bool | None = None,
+                 blocking: bool = True, receive_buffer: int | None = None):
+        if privileged is None:
+            try:
+                self._sock = self._create_socket(privileged=False)
+                privileged = False
+            except PermissionError:
+                self._sock = self._create_socket(privileged=True)
+                privileged = True
+        else:
+            self._sock = self._create_socket(privileged)
+        self._sock.setblocking(blocking)
+        if receive_buffer:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                  receive_buffer)
+        self.privileged = privileged
+        self.ident = os.getpid() & 0xFFFF
+
+    @staticmethod
+    def _create_socket(privileged: bool) -> socket.socket:
+        sock_type = socket.SOCK_RAW if privileged else socket.SOCK_DGRAM
+        return socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fileno(self) -> int:
+        """Returns the file descriptor of the underlying socket."""
+        return self._sock.fileno()
+
+    def close(self):
+        """Closes the underlying socket."""
+        self._sock.close()
+
+    def send(self, request: ICMPRequest):
+        """
+        Sends an ICMP Echo Request.
+
+        Args:
+            request (ICMPRequest): The request to send.
+        """
+        self._sock.sendto(request.packet(), (request.destination, 0))
+
+    def send_many(self, requests: list) -> int:
+        """
+        Sends a batch of Echo Requests with as few syscalls as possible.
+
+        On Linux the requests are handed to sendmmsg(2) in chunks of
+        `SENDMMSG_BATCH`. Sending stops at the first request whose
+        destination is not a dotted-quad address or that the kernel
+        does not accept; the caller should fall back to `send` for
+        the rest, which resolves host names and surfaces errors.
+
+        Args:
+            requests (list[ICMPRequest]): The requests to send.
+
+        Returns:
+            int: How many of the leading requests were sent. Always 0
+            where sendmmsg is not available.
+        """
+        if _sendmmsg is None:
+            return 0
+        sent = 0
+        for start in range(0, len(requests), SENDMMSG_BATCH):
+            chunk = requests[start:start + SENDMMSG_BATCH]
+            wanted = len(chunk)
+            addresses = (_SockAddrIn * wanted)()
+            for index, request in enumerate(chunk):
+                try:
+                    packed = socket.inet_aton(request.destination)
+                except OSError:
+                    # Not a dotted quad (e.g. a host name): leave it
+                    # and the rest to send, which resolves names
+                    chunk = chunk[:index]
+                    break
+                addresses[index].sin_family = socket.AF_INET
+                addresses[index].sin_addr[:] = packed
+            if not chunk:
+                break
+            packets = [request.packet() for request in chunk]
+            iovecs = (_IOVec * len(chunk))()
+            messages = (_MMsgHdr * len(chunk))()
+            for index, packet in enumerate(packets):
+                iovecs[index].iov_base = ctypes.cast(
+                    ctypes.c_char_p(packet), ctypes.c_void_p)
+                iovecs[index].iov_len = len(packet)
+                header = messages[index].msg_hdr
+                header.msg_name = ctypes.addressof(addresses[index])
+                header.msg_namelen = ctypes.sizeof(_SockAddrIn)
+                header.msg_iov = ctypes.pointer(iovecs[index])
+                header.msg_iovlen = 1
+            count = _sendmmsg(self.fileno(), messages, len(chunk), 0)
+            if count <= 0:
+                break
+            sent += count
+            if count < wanted:
+                break
+        return sent
+
+    def receive(self, timeout: float):
+        """
+        Waits for the next Echo Reply addressed to this socket.
+
+        Messages that are not Echo Replies, or that belong to another
+        process on a raw socket, are skipped. On datagram sockets the
+        kernel rewrites the identifier and filters replies itself.
+
+        Args:
+            timeout (float): Maximum time to wait, in seconds.
+
+        Returns:
+            ICMPReply | None: The reply, or None if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            readable, _, _ = select.select([self._sock], [], [], remaining)
+            if not readable:
+                return None
+            reply = self._parse(*self._sock.recvfrom(1024))
+            if reply is not None:
+                return reply
+        return None
+
+    def read_replies(self):
+        """
+        Yields every Echo Reply already queued on a non-blocking socket.
+
+        Draining the queue in one go means a single readiness callback
+        handles a whole burst of replies.
+
+        Yields:
+            ICMPReply: The queued replies, in arrival order.
+        """
+        while True:
+            try:
+                packet, address = self._sock.recvfrom(1024)
+            except BlockingIOError:
+                return
+            reply = self._parse(packet, address)
+            if reply is not None:
+                yield reply
+
+    def _parse(self, packet: bytes, address: tuple):
+        reply = ICMPReply.parse(packet, address[0], self.privileged)
+        if reply is None or reply.type != ICMP_ECHO_REPLY:
+            return None
+        if self.privileged and reply.ident != self.ident:
+            return None
+        return reply
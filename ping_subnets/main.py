@@ -10,23 +10,137 @@ any pull request at Joby and want to see you give us your
 best in performance and style! We will set the review up
 to be anonymous to ensure an unbiased review of your submission.
 """
+import asyncio
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 import ipaddress
-import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
 import logging
+import shutil
+import socket
+import subprocess
 import sys
-from tqdm import tqdm
-
-# Configure the logger
-logging.basicConfig(
-    level=logging.INFO,  # Set the logging level to INFO
-    # Define the log message format
-    format='%(asctime)s - [%(funcName)s:%(lineno)d] '\
-           '- %(levelname)s - %(message)s')
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator, Sized
+try:
+    from tqdm import tqdm
+except ImportError:  # optional, installed with the "progress" extra
+    tqdm = None
+from ping_subnets.icmp import ICMPRequest, ICMPv4Socket
+
+logger = logging.getLogger(__name__)
 CIDR = 30
+# Prefix lengths accepted by validate_subnet unless the caller overrides them
+ALLOWED_PREFIXES = (CIDR,)
+# Seconds to wait for an Echo Reply before an attempt counts as failed
+TIMEOUT = 1.0
+# Upper bound on the number of hosts awaiting a reply at once
+MAX_IN_FLIGHT = 256
+# Kernel receive buffer reserved per in-flight request (reply + skb overhead)
+REPLY_BUFFER_BYTES = 1024
+# ping command used when ICMP sockets are unavailable. An absolute path
+# and close_fds=False let subprocess use posix_spawn instead of fork/exec
+PING_ARGV = [shutil.which("ping") or "/bin/ping", "-c", "1"]
+if sys.platform.startswith("linux"):
+    # iputils reads -W in seconds; BSD/macOS ping reads milliseconds,
+    # so elsewhere only the process.wait timeout bounds an attempt
+    PING_ARGV += ["-W", str(int(TIMEOUT))]
+# Threads running the ping command fallback
+MAX_WORKERS = 10
+
+# Shared across scans so threads and event loops are not recreated per call
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+_LOCAL = threading.local()
+# Every loop cached in _LOCAL by any thread, closed at exit
+_LOOPS: set = set()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """
+    Returns the module-wide thread pool, creating it on first use.
 
+    The pool is shut down automatically at interpreter exit.
+
+    Returns:
+        ThreadPoolExecutor: The shared executor.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+            atexit.register(shutdown_pool)
+        return _POOL
+
+
+def shutdown_pool():
+    """
+    Shuts down the shared thread pool and this thread's event loop.
+
+    Library users that embed the scanner in a long running process
+    can call this to release the resources early; they are
+    recreated on the next scan. Event loops are cached per thread,
+    so only the calling thread's loop is closed here; each thread
+    that ran a scan should call this itself. Any loop still open
+    is closed at interpreter exit.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True)
+            _POOL = None
+            atexit.unregister(shutdown_pool)
+    loop = getattr(_LOCAL, "loop", None)
+    if loop is not None:
+        # _close_loops may already have run, e.g. when atexit calls
+        # it before this function
+        with _POOL_LOCK:
+            _LOOPS.discard(loop)
+        if not loop.is_closed():
+            loop.close()
+        _LOCAL.loop = None
+
+
+def _close_loops():
+    """
+    Closes every cached event loop that is not running.
 
-def check_retries(retries: int)->int:
+    Registered with atexit when the first loop is created.
+    """
+    with _POOL_LOCK:
+        loops = list(_LOOPS)
+        _LOOPS.clear()
+    for loop in loops:
+        if not loop.is_running() and not loop.is_closed():
+            loop.close()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop cached for the calling thread.
+
+    Each loop holds an epoll fd and a self-pipe, so every cached
+    loop is tracked and closed at interpreter exit unless
+    `shutdown_pool` closes it first.
+
+    Returns:
+        asyncio.AbstractEventLoop: An open event loop, created on
+        first use in each thread.
+    """
+    loop = getattr(_LOCAL, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _LOCAL.loop = asyncio.new_event_loop()
+        with _POOL_LOCK:
+            if not _LOOPS:
+                atexit.unregister(_close_loops)
+                atexit.register(_close_loops)
+            _LOOPS.add(loop)
+    return loop
+
+
+def check_retries(retries: int) -> int:
     """
     Validates the number of retries and ensures it is within the range [1, 3].
 
@@ -43,24 +157,27 @@ def check_retries(retries: int)->int:
         Warning: If `retries` is not between 1 and 3.
     """
     if not 1 <= retries <= 3:
-        logging.warning("Retries must be between 1 and 3. Defaulting to 1.")
+        logger.warning("Retries must be between 1 and 3. Defaulting to 1.")
         return 1
         # raise ValueError("Retries must be between 1 and 3.")
     return retries
 
 
-def validate_subnet(subnet)->bool:
+def validate_subnet(subnet, allowed_prefixes=ALLOWED_PREFIXES) -> bool:
     """
     Validates the subnet and ensures it has correct CIDR notation value.
 
     This function performs the following:
     - Validates that the CIDR notation is valid.
-    - Logs a warning for CIDR values not equal to 24, will return False.
+    - Logs a warning for prefix lengths not in `allowed_prefixes`,
+    will return False.
     - Logs warning for subnets that have host bits set, returns False.
 
     Args:
         subnet (str): The IPv4 subnet in CIDR notation
         (e.g., '192.168.1.0/24').
+        allowed_prefixes (tuple[int], optional): The accepted
+        prefix lengths (default is `ALLOWED_PREFIXES`).
 
     Returns:
         bool: True or False value
@@ -77,18 +194,19 @@ def validate_subnet(subnet)->bool:
     """
     try:
         network = ipaddress.IPv4Network(subnet, strict=True)
-        if network.prefixlen != CIDR:
-            logging.warning("(%s): Only /24 subnets are allowed.", subnet)
+        if network.prefixlen not in allowed_prefixes:
+            logger.warning("(%s): Only /%s subnets are allowed.", subnet,
+                           ", /".join(map(str, allowed_prefixes)))
             return False
             # raise ValueError("Only /24 subnets are allowed.")
         return True
     except ValueError as error:
-        logging.warning("Invalid subnet '{%s}': {%s}", subnet, error)
+        logger.warning("Invalid subnet '{%s}': {%s}", subnet, error)
         # raise ValueError(f"Invalid subnet '{subnet}': {e}")
         return False
 
 
-def validate_ignore_list(subnet, ignore_list)->list:
+def validate_ignore_list(subnet, ignore_list) -> Iterator[str]:
     """
     Validates the ignore_list for a given subnet.
 
@@ -97,7 +215,8 @@ def validate_ignore_list(subnet, ignore_list)->list:
     - Logs a warning for any octet in the ignore_list that is
     out of range (0-255).
     - Generates all valid host IPs for the given subnet
-    (excluding network and broadcast addresses).
+    (excluding network and broadcast addresses) lazily, so
+    large subnets are never materialized.
     - Filters out any IPs whose last octet matches values in the ignore_list.
 
     Args:
@@ -106,7 +225,8 @@ def validate_ignore_list(subnet, ignore_list)->list:
         A list of octets to be excluded from the subnet.
 
     Returns:
-        list[str]: A list of filtered IP addresses as strings.
+        Iterator[str]: The filtered IP addresses as strings,
+        in ascending order.
 
     Raises:
         ValueError: If any entry in the ignore_list is not an integer.
@@ -115,7 +235,7 @@ def validate_ignore_list(subnet, ignore_list)->list:
     Example:
         >>> subnet = "192.168.1.0/30"
         >>> ignore_list = [1, 2]
-        >>> validate_ignore_list(subnet, ignore_list)
+        >>> list(validate_ignore_list(subnet, ignore_list))
         ['192.168.1.3']
     """
     # Validate that all elements in ignore_list are integers
@@ -125,46 +245,108 @@ def validate_ignore_list(subnet, ignore_list)->list:
     # Check for out-of-range octets and log warnings
     for octet in ignore_list:
         if octet < 0 or octet > 255:
-            logging.warning("Octet {%s} in ignore_list is out of range "
-                            "(0-255).", octet)
+            logger.warning("Octet {%s} in ignore_list is out of range "
+                           "(0-255).", octet)
 
-    # Generate all IPs in the subnet
-    network = ipaddress.IPv4Network(subnet, strict=True)
-    # network_address = network.network_address
-    # broadcast_address = network.broadcast_address
+    # Parse the subnet now so a bad one raises here rather than
+    # when the returned iterator is first consumed
+    ipaddress.IPv4Network(subnet, strict=True)
+    return _subnet_hosts(subnet, ignore_list)
 
-    # Generate all IPs in the subnet
-    # .hosts() excludes the network and broadcast by default
-    subnet_ips = list(network.hosts())
-    # subnet_ips = list(network)
 
-    # Filter out IPs with last octet in ignore_list
-    filtered_ips = [
-        str(ip) for ip in subnet_ips
-        if ip.packed[-1] not in ignore_list
-    ]
-    return filtered_ips
+def _subnet_hosts(subnet, ignore_list) -> Iterator[str]:
+    """
+    Yields the host IPs of a subnet whose last octet is not ignored.
+
+    Args:
+        subnet (str): The IPv4 subnet in CIDR notation.
+        ignore_list (list[int]): Last octets to skip.
+
+    Yields:
+        str: The host IP addresses, in ascending order.
+    """
+    # Out-of-range octets can never match a host, so drop them
+    ignore_set = frozenset(octet for octet in ignore_list
+                           if 0 <= octet <= 255)
 
+    network = ipaddress.IPv4Network(subnet, strict=True)
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+
+    # A /30 (the default CIDR) has exactly two hosts
+    if network.prefixlen == 30:
+        for host in (first + 1, first + 2):
+            if host & 0xFF not in ignore_set:
+                yield socket.inet_ntoa(host.to_bytes(4, "big"))
+        return
+
+    # Skip the network and broadcast addresses like .hosts() does,
+    # except for /31 and /32 where every address is a host
+    if network.prefixlen < 31:
+        first, last = first + 1, last - 1
+
+    # The filter only depends on the last octet, so decide it once
+    # for all 256 values instead of once per host
+    kept_octets = [(octet, str(octet)) for octet in range(256)
+                   if octet not in ignore_set]
+
+    # Emit hosts one /24 block at a time as "a.b.c." + octet
+    for block in range(first & ~0xFF, last + 1, 256):
+        prefix = socket.inet_ntoa(block.to_bytes(4, "big"))[:-1]
+        low, high = first - block, last - block
+        if low <= 0 and high >= 255:
+            yield from [prefix + text for _, text in kept_octets]
+        else:
+            yield from [prefix + text for octet, text in kept_octets
+                        if low <= octet <= high]
+
+
+def _count_hosts(subnet, ignore_list) -> int:
+    """
+    Counts the hosts `_subnet_hosts` yields without generating them.
 
-def ping_ip(ip_addr, retries):
+    Args:
+        subnet (str): The IPv4 subnet in CIDR notation.
+        ignore_list (list[int]): Last octets to skip.
+
+    Returns:
+        int: The number of host IPs whose last octet is not ignored.
+    """
+    network = ipaddress.IPv4Network(subnet, strict=True)
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    if network.prefixlen < 31:
+        first, last = first + 1, last - 1
+    count = last - first + 1
+    for octet in {octet for octet in ignore_list if 0 <= octet <= 255}:
+        # Hosts in [first, last] whose last octet is `octet`
+        count -= (last - octet) // 256 - (first - 1 - octet) // 256
+    return count
+
+
+def ping_ip(ip_addr, retries, timeout=TIMEOUT):
     """
     Pings a given IP address a specified number of
     times and returns the result.
 
-    This function attempts to ping the provided IP address
-    for a number of retries. If the ping is successful, it
-    returns the IP address along with `True`. If the ping
-    fails or an exception occurs, it returns the IP address
-    with `False`. It also logs warnings for failed attempts
-    or exceptions during the ping process.
+    This function sends `retries` + 1 ICMP Echo Requests to
+    the provided IP address back-to-back over an ICMP socket
+    and waits up to `timeout` seconds in total for a reply to
+    any of them. Since ICMP loss is mostly independent per
+    packet, this is about as reliable as retrying one probe at
+    a time, while an unreachable host costs one timeout
+    instead of one per attempt. If a reply arrives, it returns
+    the IP address along with `True`. If none arrives or an
+    exception occurs, it returns the IP address with `False`.
+    If no ICMP socket can be opened, the system ping command
+    is used instead.
 
     Args:
-        ip_addr (str): The IP address to ping.
-        retries (int): The number of retries to attempt
-        if the ping fails.
-        n (int): An additional parameter
-        (not currently used in the function, can be
-        used for future extensions).
+        ip_addr (str): The IP address or host name to ping.
+        retries (int): The number of extra Echo Requests
+        to send in case some are lost.
+        timeout (float, optional): Seconds to wait for a
+        reply (default is `TIMEOUT`).
 
     Returns:
         tuple: A tuple containing:
@@ -173,139 +355,295 @@ def ping_ip(ip_addr, retries):
             is successful, `False` otherwise).
 
     Logs:
-        Warning: If a ping attempt fails, or if an
-        exception occurs during the ping process.
+        Warning: If an exception occurs during the ping process.
 
     Example:
         ip = "192.168.1.1"
         retries = 3
-        result = ping_ip(ip, retries, 0)
+        result = ping_ip(ip, retries)
         print(result)  # Output: ("192.168.1.1", True) if
         ping is successful, else ("192.168.1.1", False)
     """
+    try:
+        sock = ICMPv4Socket()
+    except OSError as error:
+        logger.warning("Cannot open ICMP socket to ping %s: %s. "
+                       "Falling back to the ping command.", ip_addr, error)
+        return _ping_ip_process(ip_addr, retries)
+
+    with sock:
+        try:
+            # Replies come from the dotted-quad address, so resolve
+            # host names and shorthand such as 127.1 once up front
+            address = socket.gethostbyname(ip_addr)
+            # Send every attempt up front and wait once for any reply
+            requests = [ICMPRequest(address, sock.ident, sequence)
+                        for sequence in range(retries+1)]
+            for request in requests[sock.send_many(requests):]:
+                sock.send(request)
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                reply = sock.receive(remaining)
+                if reply is None:
+                    break
+                if reply.source == address and reply.sequence <= retries:
+                    return ip_addr, True
+        except OSError as error:
+            logger.warning("Exception occurred while pinging %s: %s",
+                           ip_addr, error)
+    return ip_addr, False
+
+
+def _ping_ip_process(ip_addr, retries):
+    """
+    Pings an IP address with the system ping command.
+
+    Fallback for `ping_ip` when the process may open neither a
+    datagram nor a raw ICMP socket. On Linux the ping binary
+    bounds each attempt with `-W`; elsewhere the wait timeout
+    below does.
+
+    Args:
+        ip_addr (str): The IP address to ping.
+        retries (int): The number of retries to attempt
+        if the ping fails.
+
+    Returns:
+        tuple: The IP address and whether the ping succeeded.
+    """
     for attempt in range(retries+1):
         try:
-            result = subprocess.run(
-                ["ping", "-c", "1", ip_addr],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=False
-            )
-            # True if ping is successful
-            return ip_addr, result.returncode == 0
-        except Exception as error:
-            logging.warning(
+            process = subprocess.Popen(PING_ARGV + [ip_addr],
+                                       stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL,
+                                       close_fds=False)
+            try:
+                if process.wait(timeout=TIMEOUT + 1) == 0:
+                    return ip_addr, True
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        except OSError as error:
+            logger.warning(
                 "Attempt %s: Exception occurred while pinging %s: %s",
                 (attempt+1), ip_addr, error)
-            # return ip, False  # Return False on exception
 
-        logging.warning("Attempt %s failed for %s. Retrying...",
-                        (attempt+1), ip_addr)
-    return ip_addr, False  # Return False on exception
+        logger.warning("Attempt %s failed for %s. Retrying...",
+                       (attempt+1), ip_addr)
+    return ip_addr, False
 
-    #  Example: Simulate pingable if last octet is even
-    # if n == 0:
-    #     return ip, int(ip.split(".")[-1]) % 2 == 0
-    # else:
-    #     return ip, int(ip.split(".")[-1]) % 2 == 1
 
-
-def ping_subnet(ips, retries)->dict:
+def _new_hosts(ips: Iterable[str], results: dict) -> Iterator[tuple]:
     """
-    Pings a list of IP addresses concurrently using a thread pool.
+    Yields the IP addresses of a stream not seen before.
 
-    This function sends a ping request to each IP address in the
-    provided list (`ips`), retrying up to the specified
-    number of times (`retries`) if the ping fails. The function
-    uses a thread pool to perform the pings concurrently
-    for improved efficiency.
+    Each new IP is recorded in `results` as unreachable, so
+    duplicates are probed once. Entries that are not IPv4
+    addresses in dotted-quad form are left unreachable and
+    skipped, since replies can only be matched to a canonical
+    address.
 
     Args:
-        ips (list of str): A list of IP addresses to ping.
-        retries (int): The number of retries to attempt if
-        a ping fails.
-        n (int): A parameter passed to the `ping_ip` function
-        (its purpose should be documented in `ping_ip`).
+        ips (Iterable[str]): The IP addresses to ping.
+        results (dict): The scan results, updated in place.
 
-    Returns:
-        dict: A dictionary where the keys are the IP addresses
-        and the values are boolean values indicating
-        whether the ping was successful (`True`) or failed (`False`).
+    Yields:
+        tuple: The IP address as given and its parsed
+        `ipaddress.IPv4Address`.
 
-    Example:
-        ips = ["192.168.1.1", "192.168.1.2"]
-        retries = 3
-        n = 5
-        result = ping_subnet(ips, retries, n)
-        print(result)
-        # Output: {"192.168.1.1": True, "192.168.1.2": False}
+    Logs:
+        Warning: For each entry that is not an IPv4 address.
     """
-    results = {}
-
-    # Adjust max_workers as needed
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_ip = {executor.submit(ping_ip, ip_addr, retries):
-                        ip_addr for ip_addr in ips}
-        # for future in as_completed(future_to_ip):
-        for future in tqdm(as_completed(future_to_ip),
-                           total=len(future_to_ip), desc="Pinging IPs"):
-            ip_addr, success = future.result()
-            results[ip_addr] = success
-    return results
+    for ip_addr in ips:
+        if ip_addr in results:
+            continue
+        results[ip_addr] = False
+        try:
+            address = ipaddress.IPv4Address(ip_addr)
+        except ValueError as error:
+            logger.warning("Cannot ping %s: %s", ip_addr, error)
+            continue
+        yield ip_addr, address
 
 
-def ping_both_subnets(ips_1: str, ips_2: str,
-                      retries: int):
+async def ping_subnet(ips, retries, timeout=TIMEOUT, progress=False,
+                      total=None) -> dict:
     """
-    Pings two different subnets concurrently and returns the
-    results for each.
-
-    This function sends ping requests to the IP addresses in two
-    separate subnets (`ips_1` and `ips_2`) concurrently using
-    a thread pool. Each subnet is pinged independently, and the
-    results for both are returned once all pings are complete.
+    Pings a stream of IP addresses concurrently over one ICMP socket.
+
+    This function keeps up to `MAX_IN_FLIGHT` IP addresses from
+    `ips` in flight on a single non-blocking ICMP socket
+    registered with the event loop. Each IP is sent `retries` + 1
+    Echo Requests back-to-back, matched to their IP by sequence
+    number, and is given up on `timeout` seconds later. As soon as
+    a host answers or times out its slot is refilled from `ips`,
+    so one slow host never holds up the others. A host is
+    reachable if any of its requests is answered, so an
+    unreachable host costs a single timeout rather than one per
+    attempt. Since `ips` is consumed lazily, only the hosts in
+    flight are buffered; the returned dictionary still holds one
+    entry per host. If no ICMP socket can be opened, each IP is
+    pinged with the system ping command on the shared thread
+    pool instead, with the same sliding window.
 
     Args:
-        ips_1 (str): A list of IP addresses for the first subnet to ping.
-        ips_2 (str): A list of IP addresses for the second subnet to ping.
-        retries (int): The number of retries to attempt if a ping fails.
+        ips (Iterable[str]): The IP addresses to ping, e.g. a
+        list or the iterator returned by `validate_ignore_list`.
+        Duplicates are pinged once. Entries that are not IPv4
+        addresses in dotted-quad form are reported as `False`.
+        retries (int): The number of extra Echo Requests
+        to send to each IP in case some are lost.
+        timeout (float, optional): Seconds to wait for the
+        replies of each host (default is `TIMEOUT`).
+        progress (bool, optional): Show a tqdm progress bar,
+        refreshed in batches, for the ICMP scan and the ping
+        command fallback alike (default is False).
+        total (int, optional): The number of distinct IPs in
+        `ips`, for the progress bar and window size when `ips`
+        has no length (default is `len(ips)` if available).
 
     Returns:
-        tuple: A tuple containing two dictionaries:
-            - The first dictionary contains the ping results
-            for the first subnet (`ips_1`).
-            - The second dictionary contains the ping results
-            for the second subnet (`ips_2`).
+        dict: A dictionary where the keys are the IP addresses
+        and the values are boolean values indicating
+        whether the ping was successful (`True`) or failed (`False`).
 
-        Each dictionary has IP addresses as keys and boolean
-        values indicating whether the ping was
-        successful (`True`) or failed (`False`).
+    Logs:
+        Warning: If an entry of `ips` is not an IPv4 address, if
+        the ICMP socket cannot be opened, if a request cannot be
+        sent, or if a progress bar is requested without tqdm
+        installed.
 
     Example:
-        ips_1 = ["192.168.1.1", "192.168.1.2"]
-        ips_2 = ["192.168.2.1", "192.168.2.2"]
+        ips = ["192.168.1.1", "192.168.1.2"]
         retries = 3
-        result_subnet1, result_subnet2 =
-        ping_both_subnets(ips_1, ips_2, retries)
-        print(result_subnet1)  # Output:
-        {"192.168.1.1": True, "192.168.1.2": False}
-        print(result_subnet2)  # Output:
-        {"192.168.2.1": True, "192.168.2.2": True}
+        result = asyncio.run(ping_subnet(ips, retries))
+        print(result)
+        # Output: {"192.168.1.1": True, "192.168.1.2": False}
     """
-
-    # Parallelize across two subnets
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_subnet1 = executor.submit(ping_subnet, ips_1, retries)
-        future_subnet2 = executor.submit(ping_subnet, ips_2, retries)
-
-        # Collect results
-        results_subnet1 = future_subnet1.result()
-        results_subnet2 = future_subnet2.result()
-
-    return results_subnet1, results_subnet2
+    results = {}
+    if total is None and isinstance(ips, Sized):
+        total = len(ips)
+    size = max(1, min(total, MAX_IN_FLIGHT)) if total else MAX_IN_FLIGHT
+    hosts = _new_hosts(ips, results)
+    loop = asyncio.get_running_loop()
+    if progress and tqdm is None:
+        logger.warning("Install tqdm to show the scan progress.")
+    # Batch refreshes so the reply path does not format a bar per host
+    progress_bar = tqdm(total=total, desc="Pinging IPs",
+                        miniters=max(1, (total or 0) // 100),
+                        mininterval=0.1) if progress and tqdm else None
+    try:
+        # Size the kernel queue so a full window of replies fits
+        # and is drained by a single readiness callback
+        sock = ICMPv4Socket(
+            blocking=False,
+            receive_buffer=size * (retries+1) * REPLY_BUFFER_BYTES)
+    except OSError as error:
+        logger.warning("Cannot open ICMP socket: %s. "
+                       "Falling back to the ping command.", error)
+        # executor future -> the IP address it pings
+        tasks = {}
+        try:
+            while True:
+                for ip_addr, address in itertools.islice(
+                        hosts, size - len(tasks)):
+                    tasks[loop.run_in_executor(
+                        _get_pool(), _ping_ip_process, str(address),
+                        retries)] = ip_addr
+                if not tasks:
+                    return results
+                done, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[tasks.pop(task)] = task.result()[1]
+                if progress_bar is not None:
+                    progress_bar.update(len(done))
+        finally:
+            if progress_bar is not None:
+                progress_bar.close()
+
+    # Sequence numbers not used by any request in flight
+    free_sequences = deque(range(size * (retries+1)))
+    # sequence number -> (request, future of the host it probes)
+    pending = {}
+    # host future -> (its IP, its sequence numbers, its timeout handle)
+    in_flight = {}
+
+    def on_readable():
+        for reply in sock.read_replies():
+            request, future = pending.get(reply.sequence, (None, None))
+            # A reused sequence number may still draw a late reply
+            # from its previous host, so the source must match too
+            if (request is not None and reply.source == request.destination
+                    and not future.done()):
+                future.set_result(True)
+
+    def expire(future):
+        if not future.done():
+            future.set_result(False)
+
+    def send_all(requests):
+        # Batch through sendmmsg, then send whatever it did not take
+        # one by one so each failure is reported
+        for request in requests[sock.send_many(requests):]:
+            try:
+                sock.send(request)
+            except OSError as error:
+                logger.warning("Exception occurred while pinging %s: %s",
+                               request.destination, error)
+
+    def start(window):
+        # (IP, destination, future, sequence numbers) per host
+        batch = [(ip_addr, str(address), loop.create_future(), [])
+                 for ip_addr, address in window]
+        requests = []
+        # One request per attempt, interleaved across hosts,
+        # all resolving the host's single future
+        for _ in range(retries+1):
+            for _, destination, future, sequences in batch:
+                sequence = free_sequences.popleft()
+                request = ICMPRequest(destination, sock.ident, sequence)
+                pending[sequence] = (request, future)
+                sequences.append(sequence)
+                requests.append(request)
+        for ip_addr, _, future, sequences in batch:
+            in_flight[future] = (ip_addr, sequences,
+                                 loop.call_later(timeout, expire, future))
+        send_all(requests)
+
+    with sock:
+        loop.add_reader(sock.fileno(), on_readable)
+        try:
+            while True:
+                # Refill the free slots, sorted by address so
+                # consecutive probes hit warm route and neighbour
+                # cache entries
+                start(sorted(itertools.islice(hosts, size - len(in_flight)),
+                             key=lambda host: host[1]))
+                if not in_flight:
+                    break
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    ip_addr, sequences, timer = in_flight.pop(future)
+                    timer.cancel()
+                    results[ip_addr] = future.result()
+                    for sequence in sequences:
+                        del pending[sequence]
+                    free_sequences.extend(sequences)
+                if progress_bar is not None:
+                    progress_bar.update(len(done))
+        finally:
+            loop.remove_reader(sock.fileno())
+            for _, _, timer in in_flight.values():
+                timer.cancel()
+            if progress_bar is not None:
+                progress_bar.close()
+    return results
 
 
-def main(subnet1: str, subnet2: str, retries: int = 1, ignore_list: list = []):
+def main(subnet1: str, subnet2: str, retries: int = 1, ignore_list: list = [],
+         allowed_prefixes: tuple = ALLOWED_PREFIXES, progress: bool = False):
     """
     Main function to ping two subnets and find IP addresses
     that are pingable on one subnet but not the other.
@@ -321,10 +659,15 @@ def main(subnet1: str, subnet2: str, retries: int = 1, ignore_list: list = []):
         CIDR format (e.g., "192.168.1.0/24").
         subnet2 (str): The second subnet in
         CIDR format (e.g., "192.168.2.0/24").
-        retries (int, optional): The number of
-        retries to attempt if a ping fails (default is 1).
+        retries (int, optional): The number of extra Echo
+        Requests sent to each IP up front, in case some are
+        lost; all of them share one timeout (default is 1).
         ignore_list (list, optional): A list of octets or
         IP addresses to exclude from the subnet (default is an empty list).
+        allowed_prefixes (tuple[int], optional): The subnet
+        prefix lengths to accept (default is `ALLOWED_PREFIXES`).
+        progress (bool, optional): Show a progress bar while
+        pinging; requires tqdm (default is False).
 
     Returns:
         list: A list of dictionaries where each dictionary
@@ -347,40 +690,58 @@ def main(subnet1: str, subnet2: str, retries: int = 1, ignore_list: list = []):
         # Output: [{'192.168.1.1': True, '192.168.2.1': False},
         {'192.168.1.2': False, '192.168.2.2': True}]
     """
-    logging.info("Initializing ping ...")
+    logger.info("Initializing ping ...")
     # validate retries input
     retries = check_retries(retries=retries)
 
     # validate subnet input
-    if not validate_subnet(subnet1) or not validate_subnet(subnet2):
-        logging.warning("Invalid subnet inputs. Terminating ...")
+    if (not validate_subnet(subnet1, allowed_prefixes) or
+            not validate_subnet(subnet2, allowed_prefixes)):
+        logger.warning("Invalid subnet inputs. Terminating ...")
         sys.exit(1)
 
     # Generate IP addresses for each subnet excluding ignored octets
     ips_subnet1 = validate_ignore_list(subnet=subnet1, ignore_list=ignore_list)
     ips_subnet2 = validate_ignore_list(subnet=subnet2, ignore_list=ignore_list)
 
-    # Perform pinging
-    results_subnet1, results_subnet2 = ping_both_subnets(
-                ips_subnet1, ips_subnet2, retries)
+    # Overlapping subnets share their hosts, which are pinged once
+    total1 = _count_hosts(subnet1, ignore_list)
+    total2 = _count_hosts(subnet2, ignore_list)
+    if ipaddress.IPv4Network(subnet1).overlaps(
+            ipaddress.IPv4Network(subnet2)):
+        total = max(total1, total2)
+    else:
+        total = total1 + total2
+
+    # Stream every distinct IP of both subnets into a single scan
+    results = _get_loop().run_until_complete(
+        ping_subnet(itertools.chain(ips_subnet1, ips_subnet2), retries,
+                    progress=progress, total=total))
 
     # find ip addresses that is pingable on one subnet but not the other
     unique_pingable = []
-    for ip1, ip2 in zip(ips_subnet1, ips_subnet2):
-        ping1 = results_subnet1[ip1]
-        ping2 = results_subnet2[ip2]
+    for ip1, ip2 in zip(_subnet_hosts(subnet1, ignore_list),
+                        _subnet_hosts(subnet2, ignore_list)):
+        ping1 = results[ip1]
+        ping2 = results[ip2]
 
         if ping1 and not ping2:
             unique_pingable.append({ip1: True, ip2: False})
 
         elif ping2 and not ping1:
             unique_pingable.append({ip1: False, ip2: True})
-    logging.info("Pinging completed ...")
+    logger.info("Pinging completed ...")
 
     return unique_pingable
 
 
 if __name__ == "__main__":
+    # Configure the logger
+    logging.basicConfig(
+        level=logging.INFO,  # Set the logging level to INFO
+        # Define the log message format
+        format='%(asctime)s - [%(funcName)s:%(lineno)d] '
+               '- %(levelname)s - %(message)s')
 
     SUBNET_1 = '192.168.1.0/30'
     SUBNET_2 = '192.168.2.0/30'
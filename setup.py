@@ -9,9 +9,9 @@ setup(
     long_description=open("README.md").read(), 
     long_description_content_type="text/markdown",
     packages=find_packages(), 
-     install_requires=[
-        "tqdm>=4.0.0", 
-    ],
+    extras_require={
+        "progress": ["tqdm>=4.0.0"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
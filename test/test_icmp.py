@@ -0,0 +1,123 @@
+import ctypes
+import socket
+import struct
+import sys
+import pytest
+import ping_subnets.icmp
+from ping_subnets.icmp import checksum, ICMPRequest, ICMPReply, ICMPv4Socket
+from ping_subnets.icmp import _MMsgHdr
+from ping_subnets.icmp import ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST
+
+def test_checksum():
+    '''
+    tests that a packet carrying its own checksum
+    sums to zero
+    '''
+    packet = ICMPRequest("127.0.0.1", 0x1234, 7, b"abc").packet()
+    assert checksum(packet) == 0
+
+def test_checksum_odd_length():
+    '''
+    tests the checksum of an odd-length packet
+    against a precomputed value
+    '''
+    assert checksum(b"\x08\x00\x00\x00\x12\x34\x00\x07abc") == 0x2162
+
+def test_request_packet():
+    '''
+    tests the echo request header fields
+    '''
+    packet = ICMPRequest("127.0.0.1", 0x1234, 7).packet()
+    icmp_type, code, _, ident, sequence = struct.unpack("!BBHHH", packet)
+
+    assert len(packet) == 8
+    assert (icmp_type, code, ident, sequence) == (ICMP_ECHO_REQUEST, 0,
+                                                  0x1234, 7)
+
+def test_reply_parse_raw():
+    '''
+    tests that the IPv4 header is stripped on raw sockets
+    '''
+    ip_header = bytes([0x45]) + bytes(19)
+    icmp = struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, 0x1234, 7)
+    reply = ICMPReply.parse(ip_header + icmp, "127.0.0.1", privileged=True)
+
+    assert (reply.type, reply.ident, reply.sequence) == (ICMP_ECHO_REPLY,
+                                                         0x1234, 7)
+
+def test_reply_parse_short():
+    '''
+    tests that a truncated datagram is rejected
+    '''
+    assert ICMPReply.parse(b"\x00\x00", "127.0.0.1", privileged=False) is None
+
+def make_socket():
+    '''
+    builds an ICMPv4Socket around a UDP socket so
+    send_many can run without ICMP permissions
+    '''
+    sock = ICMPv4Socket.__new__(ICMPv4Socket)
+    sock._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.privileged = False
+    sock.ident = 0x1234
+    return sock
+
+@pytest.mark.skipif(not sys.platform.startswith("linux")
+                    or sys.maxsize <= 2**32,
+                    reason="struct mmsghdr layout of 64-bit Linux")
+def test_mmsghdr_size():
+    '''
+    tests that the ctypes mmsghdr matches the
+    64-byte kernel layout
+    '''
+    assert ctypes.sizeof(_MMsgHdr) == 64
+
+def test_send_many_unavailable(monkeypatch):
+    '''
+    tests that send_many sends nothing without sendmmsg
+    '''
+    monkeypatch.setattr(ping_subnets.icmp, "_sendmmsg", None)
+    requests = [ICMPRequest("127.0.0.1", 0x1234, 0)]
+
+    with make_socket() as sock:
+        assert sock.send_many(requests) == 0
+
+def test_send_many_short_count(monkeypatch):
+    '''
+    tests that send_many stops at the first chunk
+    the kernel only partly accepts
+    '''
+    counts = []
+
+    def sendmmsg(fd, messages, length, flags):
+        counts.append(length)
+        return length if len(counts) == 1 else 1
+
+    monkeypatch.setattr(ping_subnets.icmp, "_sendmmsg", sendmmsg)
+    monkeypatch.setattr(ping_subnets.icmp, "SENDMMSG_BATCH", 2)
+    requests = [ICMPRequest("127.0.0.1", 0x1234, sequence)
+                for sequence in range(6)]
+
+    with make_socket() as sock:
+        assert sock.send_many(requests) == 3
+    assert counts == [2, 2]
+
+def test_send_many_host_name(monkeypatch):
+    '''
+    tests that send_many stops before a destination
+    that is not a dotted quad, leaving it to send
+    '''
+    counts = []
+
+    def sendmmsg(fd, messages, length, flags):
+        counts.append(length)
+        return length
+
+    monkeypatch.setattr(ping_subnets.icmp, "_sendmmsg", sendmmsg)
+    requests = [ICMPRequest(destination, 0x1234, 0)
+                for destination in ("127.0.0.1", "localhost", "127.0.0.1")]
+
+    with make_socket() as sock:
+        assert sock.send_many(requests) == 1
+        assert sock.send_many(requests[1:]) == 0
+    assert counts == [1]
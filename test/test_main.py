@@ -1,7 +1,90 @@
 import pytest
+import asyncio
 import ipaddress
+import socket
+import time
+import ping_subnets.main
+from ping_subnets.icmp import ICMPReply, ICMP_ECHO_REPLY
 from ping_subnets.main import check_retries, validate_subnet
-from ping_subnets.main import validate_ignore_list, ping_subnet
+from ping_subnets.main import validate_ignore_list, ping_subnet, ping_ip
+from ping_subnets.main import main, _count_hosts
+
+
+class FakeSocket:
+    '''
+    stands in for ICMPv4Socket: every request sent is
+    passed to `answer`, whose replies are queued and
+    signalled through a socketpair so the event loop
+    sees the fake as readable
+    '''
+    ident = 0x1234
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.sent = []
+        self.replies = []
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._reader.close()
+        self._writer.close()
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def send_many(self, requests):
+        return 0
+
+    def send(self, request):
+        self.sent.append(request)
+        for source, sequence in self.answer(request):
+            self.replies.append(ICMPReply(source, self.ident, sequence,
+                                          ICMP_ECHO_REPLY, 0))
+            self._writer.send(b"x")
+
+    def read_replies(self):
+        try:
+            self._reader.recv(4096)
+        except BlockingIOError:
+            pass
+        replies, self.replies = self.replies, []
+        yield from replies
+
+    def receive(self, timeout):
+        return self.replies.pop(0) if self.replies else None
+
+
+class FakeBar:
+    '''
+    stands in for tqdm and records the total and updates
+    '''
+    bars = []
+
+    def __init__(self, total=None, **kwargs):
+        self.total = total
+        self.count = 0
+        FakeBar.bars.append(self)
+
+    def update(self, count):
+        self.count += count
+
+    def close(self):
+        pass
+
+
+def use_fake_socket(monkeypatch, answer):
+    '''
+    replaces the ICMP socket of ping_subnets.main
+    with a FakeSocket and returns it
+    '''
+    fake = FakeSocket(answer)
+    monkeypatch.setattr(ping_subnets.main, "ICMPv4Socket",
+                        lambda **kwargs: fake)
+    return fake
 
 def test_valid_check_retries():
     '''
@@ -75,6 +158,15 @@ def test_validate_subnet_6():
 
     assert result == False
 
+def test_validate_subnet_allowed_prefixes():
+    '''
+    tests that allowed_prefixes overrides the
+    accepted prefix lengths
+    '''
+    assert validate_subnet("192.168.1.0/24", allowed_prefixes=(24, 30))
+    assert validate_subnet("192.168.1.0/30", allowed_prefixes=(24, 30))
+    assert not validate_subnet("10.0.0.0/16", allowed_prefixes=(24, 30))
+
 def test_ignore_list_1():
     '''
     tests a valid ignore_list
@@ -83,7 +175,7 @@ def test_ignore_list_1():
     ignore_list = [25, 27]
     network = ipaddress.IPv4Network(subnet, strict=True)
     
-    result = validate_ignore_list(subnet, ignore_list)
+    result = list(validate_ignore_list(subnet, ignore_list))
     expected_list = [str(ip) for ip in list(network.hosts())
                      if ip.packed[-1] not in ignore_list]
     assert result == expected_list
@@ -98,8 +190,235 @@ def test_ignore_list_2():
     ignore_list = [25, 280]
     network = ipaddress.IPv4Network(subnet, strict=True)
     
-    result = validate_ignore_list(subnet, ignore_list)
+    result = list(validate_ignore_list(subnet, ignore_list))
     expected_list = [str(ip) for ip in list(network.hosts())
                      if ip.packed[-1] not in ignore_list]
 
     assert result == expected_list
+
+@pytest.mark.parametrize("subnet", ["192.168.1.0/30", "192.168.1.0/31",
+                                    "192.168.0.0/23", "192.168.0.0/22"])
+@pytest.mark.parametrize("ignore_list", [[], [0, 255], [1, 2, 3],
+                                         [128, 300, -1]])
+def test_ignore_list_matches_hosts(subnet, ignore_list):
+    '''
+    tests the generated hosts against the ipaddress
+    .hosts() filter across prefix lengths
+    '''
+    network = ipaddress.IPv4Network(subnet, strict=True)
+
+    result = list(validate_ignore_list(subnet, ignore_list))
+    expected_list = [str(ip) for ip in network.hosts()
+                     if ip.packed[-1] not in ignore_list]
+
+    assert result == expected_list
+    assert _count_hosts(subnet, ignore_list) == len(expected_list)
+
+def test_ignore_list_invalid_subnet():
+    '''
+    tests that an invalid subnet raises before
+    the returned iterator is consumed
+    '''
+    with pytest.raises(ValueError):
+        validate_ignore_list("192.168.1.1/24", [])
+
+def test_ping_subnet_streams_input(monkeypatch):
+    '''
+    tests that ping_subnet pulls hosts from an iterator
+    no further ahead than MAX_IN_FLIGHT
+    '''
+    monkeypatch.setattr(ping_subnets.main, "MAX_IN_FLIGHT", 4)
+    consumed = []
+    ahead = []
+
+    def hosts():
+        for ip in validate_ignore_list("10.0.0.0/24", []):
+            consumed.append(ip)
+            yield ip
+
+    def answer(request):
+        ahead.append(len(consumed) - len(fake.sent))
+        return [(request.destination, request.sequence)]
+
+    fake = use_fake_socket(monkeypatch, answer)
+    result = asyncio.run(ping_subnet(hosts(), retries=0))
+
+    assert len(result) == 254 and all(result.values())
+    assert max(ahead) < 4
+
+def test_ping_subnet_sliding_window(monkeypatch):
+    '''
+    tests that a silent host does not hold up the
+    hosts queued behind it
+    '''
+    monkeypatch.setattr(ping_subnets.main, "MAX_IN_FLIGHT", 2)
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4", "10.0.0.5"]
+    sent_at = []
+
+    def answer(request):
+        sent_at.append(time.monotonic())
+        if request.destination == "10.0.0.1":
+            return []
+        return [(request.destination, request.sequence)]
+
+    fake = use_fake_socket(monkeypatch, answer)
+    result = asyncio.run(ping_subnet(ips, retries=0, timeout=0.5))
+
+    assert result == {"10.0.0.1": False, "10.0.0.2": True,
+                      "10.0.0.3": True, "10.0.0.4": True,
+                      "10.0.0.5": True}
+    assert [request.destination for request in fake.sent] == ips
+    # every host was sent before the silent one timed out
+    assert sent_at[-1] - sent_at[0] < 0.25
+
+def test_ping_ip_any_reply(monkeypatch):
+    '''
+    tests that ping_ip sends retries + 1 distinct
+    sequences and a reply to the last one is enough
+    '''
+    def answer(request):
+        if request.sequence == 2:
+            return [(request.destination, request.sequence)]
+        return []
+
+    fake = use_fake_socket(monkeypatch, answer)
+    result = ping_ip("10.0.0.1", retries=2, timeout=0.1)
+
+    assert result == ("10.0.0.1", True)
+    assert [request.sequence for request in fake.sent] == [0, 1, 2]
+
+def test_ping_ip_host_name(monkeypatch):
+    '''
+    tests that ping_ip resolves a host name once and
+    matches replies from the resolved address
+    '''
+    fake = use_fake_socket(
+        monkeypatch, lambda request: [(request.destination,
+                                       request.sequence)])
+
+    assert ping_ip("localhost", retries=0, timeout=0.1) == ("localhost",
+                                                            True)
+    assert fake.sent[0].destination == "127.0.0.1"
+
+def test_ping_ip_other_source(monkeypatch):
+    '''
+    tests that ping_ip ignores a reply with a matching
+    sequence from another host
+    '''
+    use_fake_socket(monkeypatch,
+                    lambda request: [("10.0.0.9", request.sequence)])
+
+    assert ping_ip("10.0.0.1", retries=1, timeout=0.1) == ("10.0.0.1",
+                                                           False)
+
+def test_ping_subnet_any_reply(monkeypatch):
+    '''
+    tests that ping_subnet sends retries + 1 distinct
+    sequences per host and a reply to one copy marks
+    the host up
+    '''
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    copies = {}
+
+    def answer(request):
+        copies.setdefault(request.destination, []).append(request.sequence)
+        if len(copies[request.destination]) == 3:
+            return [(request.destination, request.sequence)]
+        return []
+
+    fake = use_fake_socket(monkeypatch, answer)
+    result = asyncio.run(ping_subnet(ips, retries=2, timeout=0.5))
+
+    assert result == dict.fromkeys(ips, True)
+    assert sorted(copies) == ips
+    assert all(len(sequences) == 3 for sequences in copies.values())
+    assert len({request.sequence for request in fake.sent}) == 9
+
+def test_ping_subnet_stale_reply(monkeypatch):
+    '''
+    tests that a late reply to a reused sequence number
+    is not credited to the host now using it
+    '''
+    monkeypatch.setattr(ping_subnets.main, "MAX_IN_FLIGHT", 1)
+
+    def answer(request):
+        # 10.0.0.1 answers only after its probe timed out,
+        # while 10.0.0.2 is probed with the same sequence
+        if request.destination == "10.0.0.2":
+            return [("10.0.0.1", request.sequence)]
+        return []
+
+    fake = use_fake_socket(monkeypatch, answer)
+    result = asyncio.run(ping_subnet(["10.0.0.1", "10.0.0.2"], retries=0,
+                                     timeout=0.1))
+
+    assert [request.sequence for request in fake.sent] == [0, 0]
+    assert result == {"10.0.0.1": False, "10.0.0.2": False}
+
+def test_shutdown_after_close_loops():
+    '''
+    tests that shutdown_pool copes with the loops
+    already closed by _close_loops, the order atexit
+    uses when the pool was created first
+    '''
+    ping_subnets.main._get_pool()
+    loop = ping_subnets.main._get_loop()
+
+    ping_subnets.main._close_loops()
+    ping_subnets.main.shutdown_pool()
+
+    assert loop.is_closed()
+    assert ping_subnets.main._get_loop() is not loop
+    ping_subnets.main.shutdown_pool()
+
+def test_main_progress_total(monkeypatch):
+    '''
+    tests that main gives the progress bar the number
+    of hosts of both subnets
+    '''
+    monkeypatch.setattr(ping_subnets.main, "tqdm", FakeBar)
+    FakeBar.bars = []
+    use_fake_socket(monkeypatch,
+                    lambda request: [(request.destination, request.sequence)])
+
+    assert main("10.0.0.0/30", "10.0.1.0/30", progress=True) == []
+    assert [(bar.total, bar.count) for bar in FakeBar.bars] == [(4, 4)]
+
+def test_ping_subnet_fallback_progress(monkeypatch):
+    '''
+    tests that the ping command fallback drives the
+    progress bar too
+    '''
+    def no_socket(**kwargs):
+        raise PermissionError("ICMP sockets are not permitted")
+
+    monkeypatch.setattr(ping_subnets.main, "tqdm", FakeBar)
+    monkeypatch.setattr(ping_subnets.main, "ICMPv4Socket", no_socket)
+    monkeypatch.setattr(ping_subnets.main, "_ping_ip_process",
+                        lambda ip, retries: (ip, ip.endswith(".1")))
+    FakeBar.bars = []
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+    result = asyncio.run(ping_subnet(iter(ips), 0, progress=True, total=3))
+
+    assert result == {"10.0.0.1": True, "10.0.0.2": False,
+                      "10.0.0.3": False}
+    assert [(bar.total, bar.count) for bar in FakeBar.bars] == [(3, 3)]
+
+def test_ping_subnet_invalid_entries(monkeypatch):
+    '''
+    tests that entries which are not dotted-quad IPv4
+    addresses are reported unreachable without
+    stopping the scan
+    '''
+    fake = use_fake_socket(
+        monkeypatch, lambda request: [(request.destination,
+                                       request.sequence)])
+    ips = ["10.0.0.2", "localhost", "10.1", "10.0.0.1"]
+
+    result = asyncio.run(ping_subnet(ips, retries=0, timeout=0.1))
+
+    assert result == {"10.0.0.2": True, "localhost": False,
+                      "10.1": False, "10.0.0.1": True}
+    assert [request.destination for request in fake.sent] == ["10.0.0.1",
+                                                              "10.0.0.2"]